@@ -1,8 +1,25 @@
 # AI Engine Package Initializer
-from .traffic_ai import TrafficAI
+# Engines are imported on first access so that importing the package stays
+# cheap and NumPy is only loaded when an engine is actually used.
+import importlib
 
 __version__ = "1.0.0"
 __author__ = "Smart Traffic Management Team"
 
-# Export main classes
-__all__ = ['TrafficAI']
\ No newline at end of file
+# Export main classes, mapped to the module that defines them
+_LAZY_EXPORTS = {
+    'TrafficAI': '.traffic_ai',
+    'EmergencyManager': '.emergency_manager',
+    'NetworkTopology': '.topology',
+    'IntersectionState': '.topology',
+    'compile_topology': '.topology',
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
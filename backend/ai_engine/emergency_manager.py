@@ -0,0 +1,139 @@
+"""
+Emergency Preemption Lifecycle
+Tracks active signal preemptions per intersection and restores the normal
+phase when they expire, using a min-heap of expiry times so each tick only
+touches the preemptions that are actually due
+"""
+
+import datetime
+import heapq
+import itertools
+import time
+from typing import Callable, Dict, List, Optional
+
+# Lower value wins when two emergencies claim the same intersection
+EMERGENCY_PRIORITIES = {
+    'ambulance': 0,
+    'medical': 0,
+    'fire': 0,
+    'police': 1,
+    'general': 2
+}
+
+class Preemption:
+    """An active emergency preemption on one intersection"""
+
+    __slots__ = ('intersection_id', 'emergency_id', 'emergency_type', 'priority',
+                 'started_at', 'expires_at', 'restore_phase')
+
+    def __init__(self, intersection_id: str, emergency_id: str, emergency_type: str,
+                 priority: int, started_at: float, expires_at: float, restore_phase: str):
+        self.intersection_id = intersection_id
+        self.emergency_id = emergency_id
+        self.emergency_type = emergency_type
+        self.priority = priority
+        self.started_at = started_at
+        self.expires_at = expires_at
+        self.restore_phase = restore_phase
+
+class EmergencyManager:
+    """
+    Applies, expires and restores emergency preemptions
+    Superseded or cleared preemptions leave stale heap entries behind, which
+    are skipped when they surface instead of being searched for and removed
+    """
+
+    def __init__(self, default_duration: float = 120, clock: Callable[[], float] = time.monotonic):
+        self.default_duration = default_duration
+        self.clock = clock
+        self.active: Dict[str, Preemption] = {}
+        self.by_emergency: Dict[str, set] = {}
+        self._expiry_heap = []
+        self._sequence = itertools.count()
+
+    def preempt(self, intersection: Dict, emergency_id: str, emergency_type: str,
+                duration: Optional[float] = None) -> bool:
+        """
+        Preempt an intersection for an emergency
+        Returns False if a higher-priority emergency already holds it
+        """
+        now = self.clock()
+        intersection_id = intersection['id']
+        priority = EMERGENCY_PRIORITIES.get(emergency_type, EMERGENCY_PRIORITIES['general'])
+        expires_at = now + (duration if duration is not None else self.default_duration)
+
+        current = self.active.get(intersection_id)
+        if current is not None:
+            if priority > current.priority:
+                return False
+            # Keep the phase from before the first preemption and never cut the current one short
+            restore_phase = current.restore_phase
+            expires_at = max(expires_at, current.expires_at)
+            self._forget(current)
+        else:
+            restore_phase = intersection['current_phase']
+
+        preemption = Preemption(intersection_id, emergency_id, emergency_type, priority,
+                                now, expires_at, restore_phase)
+        self.active[intersection_id] = preemption
+        self.by_emergency.setdefault(emergency_id, set()).add(intersection_id)
+        heapq.heappush(self._expiry_heap, (expires_at, next(self._sequence), preemption))
+
+        intersection['emergency_mode'] = True
+        intersection['emergency_id'] = emergency_id
+        intersection['current_phase'] = 'emergency_preemption'
+        intersection['last_updated'] = datetime.datetime.now().isoformat()
+        return True
+
+    def expire(self, traffic_data: Dict) -> List[str]:
+        """Restore every intersection whose preemption is due; returns their ids"""
+        now = self.clock()
+        restored = []
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            _, _, preemption = heapq.heappop(self._expiry_heap)
+            if self.active.get(preemption.intersection_id) is not preemption:
+                continue  # superseded or cleared
+            self._restore(traffic_data, preemption)
+            restored.append(preemption.intersection_id)
+        return restored
+
+    def clear(self, traffic_data: Dict, emergency_id: str) -> List[str]:
+        """End an emergency early and restore the intersections it holds"""
+        restored = []
+        for intersection_id in list(self.by_emergency.get(emergency_id, ())):
+            self._restore(traffic_data, self.active[intersection_id])
+            restored.append(intersection_id)
+        return restored
+
+    def is_preempted(self, intersection_id: str) -> bool:
+        return intersection_id in self.active
+
+    def get_active(self) -> List[Dict]:
+        """Active preemptions with wall-clock expiry times"""
+        now = self.clock()
+        wall_now = datetime.datetime.now()
+        return [{
+            'intersection_id': p.intersection_id,
+            'emergency_id': p.emergency_id,
+            'type': p.emergency_type,
+            'priority': p.priority,
+            'expires_at': (wall_now + datetime.timedelta(seconds=p.expires_at - now)).isoformat(),
+            'remaining_seconds': round(max(0, p.expires_at - now), 1)
+        } for p in self.active.values()]
+
+    def _restore(self, traffic_data: Dict, preemption: Preemption):
+        self._forget(preemption)
+        intersection = traffic_data['intersections'].get(preemption.intersection_id)
+        if intersection is None:
+            return
+        intersection['emergency_mode'] = False
+        intersection.pop('emergency_id', None)
+        intersection['current_phase'] = preemption.restore_phase
+        intersection['last_updated'] = datetime.datetime.now().isoformat()
+
+    def _forget(self, preemption: Preemption):
+        del self.active[preemption.intersection_id]
+        holders = self.by_emergency[preemption.emergency_id]
+        holders.discard(preemption.intersection_id)
+        if not holders:
+            del self.by_emergency[preemption.emergency_id]
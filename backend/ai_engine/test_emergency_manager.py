@@ -0,0 +1,75 @@
+"""Tests for preemption expiry, supersede and clear in EmergencyManager"""
+
+from ai_engine.emergency_manager import EmergencyManager
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_traffic_data(*ids):
+    return {'intersections': {i: {'id': i, 'current_phase': 'north_south_green', 'emergency_mode': False}
+                              for i in ids}}
+
+def test_expire_restores_only_due_preemptions():
+    clock = FakeClock()
+    manager = EmergencyManager(clock=clock)
+    traffic_data = make_traffic_data('A', 'B')
+    intersections = traffic_data['intersections']
+    manager.preempt(intersections['A'], 'E1', 'police', duration=10)
+    manager.preempt(intersections['B'], 'E2', 'police', duration=30)
+    assert intersections['A']['current_phase'] == 'emergency_preemption'
+
+    clock.now = 10
+    assert manager.expire(traffic_data) == ['A']
+    assert intersections['A']['current_phase'] == 'north_south_green'
+    assert intersections['A']['emergency_mode'] is False
+    assert 'emergency_id' not in intersections['A']
+    assert manager.is_preempted('B')
+
+    clock.now = 30
+    assert manager.expire(traffic_data) == ['B']
+    assert manager.active == {} and manager.by_emergency == {}
+
+def test_lower_priority_cannot_supersede():
+    manager = EmergencyManager(clock=FakeClock())
+    intersection = make_traffic_data('A')['intersections']['A']
+    assert manager.preempt(intersection, 'E1', 'ambulance', duration=10)
+    assert not manager.preempt(intersection, 'E2', 'general', duration=10)
+    assert intersection['emergency_id'] == 'E1'
+
+def test_supersede_keeps_restore_phase_and_later_expiry():
+    clock = FakeClock()
+    manager = EmergencyManager(clock=clock)
+    traffic_data = make_traffic_data('A')
+    intersection = traffic_data['intersections']['A']
+    manager.preempt(intersection, 'E1', 'police', duration=60)
+    assert manager.preempt(intersection, 'E2', 'ambulance', duration=10)
+    assert intersection['emergency_id'] == 'E2'
+    assert 'E1' not in manager.by_emergency
+
+    clock.now = 10
+    assert manager.expire(traffic_data) == []  # never cut the first preemption short
+    clock.now = 60
+    assert manager.expire(traffic_data) == ['A']  # the stale E1 entry is skipped
+    assert intersection['current_phase'] == 'north_south_green'
+    assert manager._expiry_heap == []
+
+def test_clear_restores_early_and_leaves_stale_entries_harmless():
+    clock = FakeClock()
+    manager = EmergencyManager(clock=clock)
+    traffic_data = make_traffic_data('A', 'B')
+    intersections = traffic_data['intersections']
+    manager.preempt(intersections['A'], 'E1', 'fire', duration=10)
+    manager.preempt(intersections['B'], 'E1', 'fire', duration=10)
+
+    assert sorted(manager.clear(traffic_data, 'E1')) == ['A', 'B']
+    assert not manager.is_preempted('A') and not manager.is_preempted('B')
+    assert manager.clear(traffic_data, 'E1') == []
+
+    intersections['A']['current_phase'] = 'east_west_green'
+    clock.now = 10
+    assert manager.expire(traffic_data) == []
+    assert intersections['A']['current_phase'] == 'east_west_green'
@@ -0,0 +1,61 @@
+"""Tests for compiling a network and reading it back memory-mapped"""
+
+import numpy as np
+import pytest
+
+from ai_engine.topology import NetworkTopology, compile_topology
+
+DEFINITION = {
+    'intersections': [
+        {'id': 'c', 'name': 'Rue de l’Église', 'region': 'old_town', 'lat': 1.0, 'lng': 2.0,
+         'traffic_count': 30, 'efficiency': 85, 'approaches': {'north': 2, 'west': 1}},
+        {'id': 'a', 'region': 'downtown', 'lat': 3.0, 'lng': 4.0},
+        {'id': 'b10', 'name': 'Main & 10th', 'region': 'downtown', 'lat': 5.0, 'lng': 6.0},
+    ],
+    'links': [
+        {'from': 'c', 'to': 'a', 'length_m': 120},
+        {'from': 'a', 'to': 'b10', 'length_m': 80, 'bidirectional': False},
+    ]
+}
+
+@pytest.fixture
+def topology(tmp_path):
+    return NetworkTopology(compile_topology(DEFINITION, str(tmp_path / 'network.topo')))
+
+def test_round_trip_keeps_fields_in_definition_order(topology):
+    assert len(topology) == 3
+    assert [topology.intersection_id(i) for i in range(3)] == ['c', 'a', 'b10']
+    assert topology.name(0) == 'Rue de l’Église'
+    assert topology.name(1) == 'a'  # defaults to the id
+    assert topology.regions == ['downtown', 'old_town']
+    assert topology.region_codes.tolist() == [1, 0, 0]
+    assert topology.coordinates.tolist() == [[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]]
+    assert topology.approach_lanes[0].tolist() == [2, 0, 0, 1]
+    assert topology.traffic_counts.tolist() == [30, 40, 40]
+    assert topology.efficiencies.tolist() == [85, 90, 90]
+    assert isinstance(topology.ids, np.memmap)
+    assert topology.meta['links'] == 3
+
+def test_links_are_stored_per_source(topology):
+    assert topology.neighbors(0).tolist() == [1]
+    assert sorted(topology.neighbors(1).tolist()) == [0, 2]
+    assert topology.neighbors(2).tolist() == []  # one-way link
+    assert topology.route(0, max_hops=2) == [0, 1, 2]
+
+def test_compile_rejects_duplicate_ids_and_unknown_links(tmp_path):
+    with pytest.raises(ValueError, match='unique'):
+        compile_topology({'intersections': [{'id': 'a'}, {'id': 'a'}]}, str(tmp_path / 'dup'))
+    with pytest.raises(ValueError, match='unknown intersection'):
+        compile_topology({'intersections': [{'id': 'a'}], 'links': [{'from': 'a', 'to': 'z'}]},
+                         str(tmp_path / 'link'))
+
+def test_index_lookups(topology):
+    assert topology.index_of('b10') == 2
+    assert topology.index_of('b') is None
+    assert topology.indices_of(['b10', 'c', 'a', 'c']).tolist() == [2, 0, 1, 0]
+    assert topology.indices_of([]).tolist() == []
+
+@pytest.mark.parametrize('unknown', ['b', 'zzz', 'b10-longer-than-any-stored-id'])
+def test_indices_of_raises_for_unknown_ids(topology, unknown):
+    with pytest.raises(KeyError, match=unknown):
+        topology.indices_of(['a', unknown])
@@ -0,0 +1,481 @@
+"""
+Road Network Topology
+Compiles a network definition (intersections, links, coordinates and approach
+metadata) into flat binary arrays that are memory-mapped when opened, so any
+number of worker processes share one page-cached copy of a city-scale network
+and opening it costs almost nothing regardless of its size
+"""
+
+import datetime
+import json
+import os
+from collections import deque
+from collections.abc import Mapping, MutableMapping
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+TOPOLOGY_FORMAT_VERSION = 1
+
+# Approach order of the approach_lanes columns
+APPROACHES = ('north', 'east', 'south', 'west')
+
+# Signal phases, by their code in IntersectionState.phase_codes
+PHASES = (
+    'north_south_green', 'east_west_green', 'north_south_yellow',
+    'east_west_yellow', 'all_red', 'emergency_preemption'
+)
+PHASE_CODES = {phase: code for code, phase in enumerate(PHASES)}
+
+# Intersection fields read from the topology; they are the same in every process
+STATIC_FIELDS = ('id', 'name', 'region', 'status', 'traffic_count', 'coordinates', 'approaches')
+
+# Intersection fields kept per process in IntersectionState columns
+MUTABLE_FIELDS = ('current_phase', 'efficiency', 'emergency_mode', 'ai_optimized', 'last_updated')
+
+# Arrays making up a compiled topology, each stored as <name>.npy
+TOPOLOGY_ARRAYS = (
+    'ids', 'sorted_ids', 'sorted_index', 'name_offsets', 'name_bytes', 'region_codes',
+    'coordinates', 'approach_lanes', 'traffic_counts', 'efficiencies',
+    'link_offsets', 'link_targets', 'link_lengths'
+)
+
+def load_topology_definition(path: str) -> Dict:
+    """Read a JSON network definition"""
+    with open(path, encoding='utf-8') as definition_file:
+        return json.load(definition_file)
+
+def compile_topology(definition: Dict, path: str) -> str:
+    """
+    Compile a network definition into the binary topology directory at path
+    Links are stored in compressed sparse row form, sorted by source intersection
+    """
+    intersections = definition['intersections']
+    count = len(intersections)
+    ids = [intersection['id'] for intersection in intersections]
+    index_of = {intersection_id: index for index, intersection_id in enumerate(ids)}
+    if len(index_of) != count:
+        raise ValueError('Intersection ids must be unique')
+
+    regions = sorted({intersection.get('region', '') for intersection in intersections})
+    region_index = {region: code for code, region in enumerate(regions)}
+
+    names = [intersection.get('name', intersection['id']).encode('utf-8') for intersection in intersections]
+    name_offsets = np.zeros(count + 1, dtype=np.int64)
+    name_offsets[1:] = np.cumsum([len(name) for name in names])
+
+    encoded_ids = np.array([intersection_id.encode('utf-8') for intersection_id in ids])
+    sorted_index = np.argsort(encoded_ids, kind='stable').astype(np.int32)
+
+    sources, targets, lengths = [], [], []
+    for link in definition.get('links', []):
+        if link['from'] not in index_of or link['to'] not in index_of:
+            raise ValueError(f"Link references unknown intersection: {link['from']} -> {link['to']}")
+        pairs = [(link['from'], link['to'])]
+        if link.get('bidirectional', True):
+            pairs.append((link['to'], link['from']))
+        for source, target in pairs:
+            sources.append(index_of[source])
+            targets.append(index_of[target])
+            lengths.append(link.get('length_m', 0))
+    sources = np.array(sources, dtype=np.int32)
+    link_order = np.argsort(sources, kind='stable')
+    link_offsets = np.zeros(count + 1, dtype=np.int64)
+    link_offsets[1:] = np.cumsum(np.bincount(sources, minlength=count))
+
+    arrays = {
+        'ids': encoded_ids,
+        'sorted_ids': encoded_ids[sorted_index],
+        'sorted_index': sorted_index,
+        'name_offsets': name_offsets,
+        'name_bytes': np.frombuffer(b''.join(names), dtype=np.uint8),
+        'region_codes': np.array([region_index[i.get('region', '')] for i in intersections], dtype=np.int16),
+        'coordinates': np.array([[i.get('lat', 0), i.get('lng', 0)] for i in intersections], dtype=np.float64).reshape(count, 2),
+        'approach_lanes': np.array([[i.get('approaches', {}).get(a, 0) for a in APPROACHES] for i in intersections],
+                                   dtype=np.int8).reshape(count, len(APPROACHES)),
+        'traffic_counts': np.array([i.get('traffic_count', 40) for i in intersections], dtype=np.int32),
+        'efficiencies': np.array([i.get('efficiency', 90) for i in intersections], dtype=np.int16),
+        'link_offsets': link_offsets,
+        'link_targets': np.array(targets, dtype=np.int32)[link_order],
+        'link_lengths': np.array(lengths, dtype=np.float32)[link_order]
+    }
+
+    os.makedirs(path, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f'{name}.npy'), array, allow_pickle=False)
+    with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as meta_file:
+        json.dump({
+            'format_version': TOPOLOGY_FORMAT_VERSION,
+            'intersections': count,
+            'links': len(arrays['link_targets']),
+            'regions': regions,
+            'approaches': list(APPROACHES),
+            'compiled_at': datetime.datetime.now().isoformat()
+        }, meta_file, indent=2)
+
+    return path
+
+class NetworkTopology:
+    """Read-only view of a compiled, memory-mapped network topology"""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as meta_file:
+            self.meta = json.load(meta_file)
+        if self.meta['format_version'] != TOPOLOGY_FORMAT_VERSION:
+            raise ValueError(f"Unsupported topology format version: {self.meta['format_version']}")
+
+        self.path = path
+        self.regions = self.meta['regions']
+        for name in TOPOLOGY_ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r', allow_pickle=False))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def index_of(self, intersection_id: str) -> Optional[int]:
+        """Index of an intersection id, by binary search over the sorted ids"""
+        key = intersection_id.encode('utf-8')
+        position = int(np.searchsorted(self.sorted_ids, key))
+        if position < len(self.sorted_ids) and self.sorted_ids[position] == key:
+            return int(self.sorted_index[position])
+        return None
+
+    def indices_of(self, intersection_ids: List[str]) -> np.ndarray:
+        """Indices of many intersection ids at once; raises KeyError for unknown ids"""
+        keys = np.array([intersection_id.encode('utf-8') for intersection_id in intersection_ids], dtype=bytes)
+        positions = np.minimum(np.searchsorted(self.sorted_ids, keys), len(self.sorted_ids) - 1)
+        unknown = self.sorted_ids[positions] != keys
+        if unknown.any():
+            raise KeyError(intersection_ids[int(np.argmax(unknown))])
+        return self.sorted_index[positions].astype(np.int64)
+
+    def intersection_id(self, index: int) -> str:
+        return self.ids[index].decode('utf-8')
+
+    def name(self, index: int) -> str:
+        start, end = self.name_offsets[index], self.name_offsets[index + 1]
+        return self.name_bytes[start:end].tobytes().decode('utf-8')
+
+    def neighbors(self, index: int) -> np.ndarray:
+        """Indices of the intersections directly reachable from index"""
+        return self.link_targets[self.link_offsets[index]:self.link_offsets[index + 1]]
+
+    def nearest(self, lat: float, lng: float) -> int:
+        """Index of the intersection closest to a coordinate"""
+        deltas = self.coordinates - np.array([lat, lng])
+        return int(np.argmin(np.einsum('ij,ij->i', deltas, deltas)))
+
+    def route(self, start: int, max_hops: int) -> List[int]:
+        """Intersections within max_hops of start, nearest first (breadth-first)"""
+        visited = {start}
+        order = [start]
+        frontier = deque([(start, 0)])
+        while frontier:
+            index, hops = frontier.popleft()
+            if hops == max_hops:
+                continue
+            for neighbor in self.neighbors(index):
+                neighbor = int(neighbor)
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    order.append(neighbor)
+                    frontier.append((neighbor, hops + 1))
+        return order
+
+class IntersectionState(MutableMapping):
+    """
+    Live intersection state over a topology, keyed by intersection id
+    Static fields are read from the memory-mapped topology on demand and the
+    mutable ones are kept in arrays indexed by topology index, so no
+    per-intersection objects exist until one is looked up. Every write bumps
+    the intersection's version so changes can be collected incrementally.
+    """
+
+    def __init__(self, topology: NetworkTopology):
+        self.topology = topology
+        self.reset()
+
+    def reset(self):
+        """Return every intersection to its compiled state"""
+        count = len(self.topology)
+        self.phase_codes = (np.arange(count) % 2).astype(np.int8)
+        self.efficiencies = np.array(self.topology.efficiencies, dtype=np.int16)
+        self.emergency_mode = np.zeros(count, dtype=bool)
+        self.ai_optimized = np.zeros(count, dtype=bool)
+        self.updated_at = np.full(count, datetime.datetime.now().timestamp())
+        # Fields outside the columns (emergency_id, optimal_timing, overrides), by index
+        self.extras: Dict[int, Dict] = {}
+        self.versions = np.zeros(count, dtype=np.int64)
+        self.version = 0
+
+    def snapshot(self) -> 'IntersectionState':
+        """A detached copy of the state; only arrays are copied, so it is cheap while the state is held"""
+        snapshot = IntersectionState.__new__(IntersectionState)
+        snapshot.topology = self.topology
+        for column in ('phase_codes', 'efficiencies', 'emergency_mode', 'ai_optimized', 'updated_at', 'versions'):
+            setattr(snapshot, column, getattr(self, column).copy())
+        snapshot.extras = {index: dict(extras) for index, extras in self.extras.items()}
+        snapshot.version = self.version
+        return snapshot
+
+    def __getitem__(self, intersection_id: str) -> 'IntersectionView':
+        index = self.topology.index_of(intersection_id) if isinstance(intersection_id, str) else None
+        if index is None:
+            raise KeyError(intersection_id)
+        return IntersectionView(self, index)
+
+    def __setitem__(self, intersection_id: str, fields: Dict):
+        self[intersection_id].update(fields)
+
+    def __delitem__(self, intersection_id: str):
+        raise TypeError('Intersections of a topology cannot be removed')
+
+    def __contains__(self, intersection_id) -> bool:
+        return isinstance(intersection_id, str) and self.topology.index_of(intersection_id) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self.topology)):
+            yield self.topology.intersection_id(index)
+
+    def __len__(self) -> int:
+        return len(self.topology)
+
+    def update(self, other=(), **kwargs):
+        """
+        Set fields by intersection id
+        Entries carrying every mutable field, as the state bus sends them, are
+        written column by column and replace the intersection's extra fields
+        """
+        changes = dict(other, **kwargs)
+        complete = {}
+        for intersection_id, fields in changes.items():
+            if isinstance(fields, Mapping) and all(field in fields for field in MUTABLE_FIELDS):
+                complete[intersection_id] = fields
+            else:
+                self[intersection_id].update(fields)
+        if not complete:
+            return
+
+        indices = self.topology.indices_of(list(complete))
+        records = list(complete.values())
+        self.phase_codes[indices] = [PHASE_CODES[record['current_phase']] for record in records]
+        self.efficiencies[indices] = [record['efficiency'] for record in records]
+        self.emergency_mode[indices] = [record['emergency_mode'] for record in records]
+        self.ai_optimized[indices] = [record['ai_optimized'] for record in records]
+        timestamps = {timestamp: datetime.datetime.fromisoformat(timestamp).timestamp()
+                      for timestamp in {record['last_updated'] for record in records}}
+        self.updated_at[indices] = [timestamps[record['last_updated']] for record in records]
+        for index, record in zip(indices.tolist(), records):
+            extras = {key: value for key, value in record.items() if key not in MUTABLE_FIELDS}
+            if extras:
+                self.extras[index] = extras
+            else:
+                self.extras.pop(index, None)
+        self.touch(indices)
+
+    def touch(self, indices):
+        """Record a change to the intersections at indices"""
+        self.version += 1
+        self.versions[indices] = self.version
+
+    def assign(self, indices: np.ndarray, efficiency: np.ndarray, phase_codes: np.ndarray,
+               last_updated: str):
+        """Vectorized write of optimization results to the intersections at indices"""
+        self.efficiencies[indices] = efficiency
+        self.phase_codes[indices] = phase_codes
+        self.updated_at[indices] = datetime.datetime.fromisoformat(last_updated).timestamp()
+        self.ai_optimized[indices] = True
+        self.touch(indices)
+
+    def region_ids(self, region: str) -> List[str]:
+        """Ids of the intersections in a region"""
+        if region not in self.topology.regions:
+            return []
+        indices = np.flatnonzero(self.topology.region_codes == self.topology.regions.index(region))
+        return [self.topology.intersection_id(index) for index in indices]
+
+    def to_dict(self, start: int = 0, stop: Optional[int] = None) -> Dict[str, Dict]:
+        """
+        Intersections start to stop (default: all) as plain dicts, built column
+        by column rather than view by view
+        """
+        topology = self.topology
+        rows = slice(start, stop)
+        ids = [intersection_id.decode('utf-8') for intersection_id in topology.ids[rows].tolist()]
+        name_offsets = topology.name_offsets[start:start + len(ids) + 1].tolist()
+        name_bytes = topology.name_bytes[name_offsets[0]:name_offsets[-1]].tobytes() if ids else b''
+        timestamps, timestamp_codes = _format_timestamps(self.updated_at[rows])
+
+        intersections = {}
+        for index, (intersection_id, region_code, traffic_count, (lat, lng), lanes, phase_code,
+                    efficiency, emergency_mode, ai_optimized, timestamp_code) in enumerate(zip(
+                ids, topology.region_codes[rows].tolist(), topology.traffic_counts[rows].tolist(),
+                topology.coordinates[rows].tolist(), topology.approach_lanes[rows].tolist(),
+                self.phase_codes[rows].tolist(), self.efficiencies[rows].tolist(),
+                self.emergency_mode[rows].tolist(), self.ai_optimized[rows].tolist(),
+                timestamp_codes.tolist()), start):
+            name_start, name_end = name_offsets[index - start] - name_offsets[0], name_offsets[index - start + 1] - name_offsets[0]
+            intersection = {
+                'id': intersection_id,
+                'name': name_bytes[name_start:name_end].decode('utf-8'),
+                'region': topology.regions[region_code],
+                'status': 'active',
+                'traffic_count': traffic_count,
+                'coordinates': {'lat': lat, 'lng': lng},
+                'approaches': dict(zip(APPROACHES, lanes)),
+                'current_phase': PHASES[phase_code],
+                'efficiency': efficiency,
+                'emergency_mode': emergency_mode,
+                'ai_optimized': ai_optimized,
+                'last_updated': timestamps[timestamp_code]
+            }
+            if index in self.extras:
+                intersection.update(self.extras[index])
+            intersections[intersection_id] = intersection
+        return intersections
+
+    def iter_chunks(self, size: int) -> Iterator[Dict[str, Dict]]:
+        """to_dict() in chunks of at most size intersections"""
+        for start in range(0, len(self), size):
+            yield self.to_dict(start, start + size)
+
+    def copy_changes(self, version: int) -> 'IntersectionChanges':
+        """Copy the mutable fields of the intersections changed after version"""
+        return IntersectionChanges(self, version)
+
+    def field(self, index: int, key: str):
+        """One mutable field of the intersection at index"""
+        if key == 'current_phase':
+            return PHASES[self.phase_codes[index]]
+        if key == 'efficiency':
+            return int(self.efficiencies[index])
+        if key == 'emergency_mode':
+            return bool(self.emergency_mode[index])
+        if key == 'ai_optimized':
+            return bool(self.ai_optimized[index])
+        return datetime.datetime.fromtimestamp(self.updated_at[index]).isoformat()
+
+class IntersectionChanges:
+    """
+    The mutable fields of changed intersections, copied column by column
+    Copying is cheap enough to do while the state is held; the per-intersection
+    dicts are only built afterwards by to_dict()
+    """
+
+    def __init__(self, state: IntersectionState, version: int):
+        self.topology = state.topology
+        self.version = state.version
+        self.indices = np.flatnonzero(state.versions > version)
+        self.phase_codes = state.phase_codes[self.indices]
+        self.efficiencies = state.efficiencies[self.indices]
+        self.emergency_mode = state.emergency_mode[self.indices]
+        self.ai_optimized = state.ai_optimized[self.indices]
+        self.updated_at = state.updated_at[self.indices]
+        self.extras = {index: dict(extras) for index, extras in state.extras.items() if state.versions[index] > version}
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def to_dict(self) -> Dict[str, Dict]:
+        """Mutable fields of the changed intersections, by id"""
+        timestamps, timestamp_codes = _format_timestamps(self.updated_at)
+        changes = {}
+        for index, phase_code, efficiency, emergency_mode, ai_optimized, timestamp_code in zip(
+                self.indices.tolist(), self.phase_codes.tolist(), self.efficiencies.tolist(),
+                self.emergency_mode.tolist(), self.ai_optimized.tolist(), timestamp_codes.tolist()):
+            fields = {
+                'current_phase': PHASES[phase_code],
+                'efficiency': efficiency,
+                'emergency_mode': emergency_mode,
+                'ai_optimized': ai_optimized,
+                'last_updated': timestamps[timestamp_code]
+            }
+            fields.update(self.extras.get(index, {}))
+            changes[self.topology.intersection_id(index)] = fields
+        return changes
+
+def _format_timestamps(updated_at: np.ndarray):
+    """
+    ISO strings for an updated_at column, as (distinct strings, code per entry)
+    Optimization passes share one timestamp, so only the distinct ones are formatted
+    """
+    timestamps, codes = np.unique(updated_at, return_inverse=True)
+    return [datetime.datetime.fromtimestamp(timestamp).isoformat() for timestamp in timestamps.tolist()], codes
+
+class IntersectionView(MutableMapping):
+    """One intersection of an IntersectionState, usable like the dicts of the demo network"""
+
+    __slots__ = ('state', 'index')
+
+    def __init__(self, state: IntersectionState, index: int):
+        self.state = state
+        self.index = index
+
+    def __getitem__(self, key: str):
+        extras = self.state.extras.get(self.index, {})
+        if key in extras:
+            return extras[key]
+        if key in MUTABLE_FIELDS:
+            return self.state.field(self.index, key)
+        if key in STATIC_FIELDS:
+            return self._static(key)
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value):
+        state, index = self.state, self.index
+        if key == 'current_phase':
+            state.phase_codes[index] = PHASE_CODES[value]
+        elif key == 'efficiency':
+            state.efficiencies[index] = value
+        elif key == 'emergency_mode':
+            state.emergency_mode[index] = bool(value)
+        elif key == 'ai_optimized':
+            state.ai_optimized[index] = bool(value)
+        elif key == 'last_updated':
+            state.updated_at[index] = datetime.datetime.fromisoformat(value).timestamp()
+        elif key in STATIC_FIELDS and key not in state.extras.get(index, {}) and self._static(key) == value:
+            return  # written back unchanged, e.g. by update() with a full copy
+        else:
+            state.extras.setdefault(index, {})[key] = value
+        state.touch(index)
+
+    def __delitem__(self, key: str):
+        extras = self.state.extras.get(self.index, {})
+        if key not in extras:
+            if key in MUTABLE_FIELDS or key in STATIC_FIELDS:
+                raise TypeError(f'Intersection field {key!r} cannot be removed')
+            raise KeyError(key)
+        del extras[key]
+        if not extras:
+            del self.state.extras[self.index]
+        self.state.touch(self.index)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from STATIC_FIELDS
+        yield from MUTABLE_FIELDS
+        for key in self.state.extras.get(self.index, {}):
+            if key not in STATIC_FIELDS and key not in MUTABLE_FIELDS:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def copy(self) -> Dict:
+        return dict(self)
+
+    def _static(self, key: str):
+        topology, index = self.state.topology, self.index
+        if key == 'id':
+            return topology.intersection_id(index)
+        if key == 'name':
+            return topology.name(index)
+        if key == 'region':
+            return topology.regions[topology.region_codes[index]]
+        if key == 'status':
+            return 'active'
+        if key == 'traffic_count':
+            return int(topology.traffic_counts[index])
+        if key == 'coordinates':
+            lat, lng = topology.coordinates[index]
+            return {'lat': float(lat), 'lng': float(lng)}
+        return dict(zip(APPROACHES, (int(lanes) for lanes in topology.approach_lanes[index])))
@@ -1,119 +1,457 @@
-from flask import Flask, request, jsonify, session
+from flask import Flask, Blueprint, Response, current_app, request, jsonify, session, make_response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import json
 import datetime
+import functools
+import itertools
+from contextlib import ExitStack
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
 import os
 import uuid
 from werkzeug.security import generate_password_hash, check_password_hash
-from ai_engine.traffic_ai import TrafficAI
-import random
+from history_export import EXPORT_FORMATS, parse_time, select_history_intersections, stream_export
+from request_scheduler import PriorityScheduler, SchedulerOverloaded
+from state_bus import DEFAULT_BUS_ADDRESS, StatePublisher, StateSubscriber
 import time
+import threading
 
-# Initialize Flask app
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'smart-traffic-management-secret-key-2025'
-app.config['SESSION_TYPE'] = 'filesystem'
+# Application modes: 'full' serves the whole API, 'health' only the system routes
+APP_MODES = ('full', 'health')
 
-# Enable CORS for React frontend
-CORS(app, supports_credentials=True, origins=['http://localhost:3000', 'http://localhost:3001', 'http://localhost:3002', 'http://localhost:3003', 'http://localhost:3004', 'http://localhost:3005', 'http://localhost:3006', 'http://localhost:3007'])
+# Shared-state roles: 'standalone' keeps state in this process, 'owner' publishes
+# it on the state bus and 'replica' is a read-only worker subscribed to the owner
+STATE_ROLES = ('standalone', 'owner', 'replica')
 
-# Initialize AI Engine
-traffic_ai = TrafficAI()
+# Route groups, registered on the app by create_app
+api_bp = Blueprint('api', __name__)
+system_bp = Blueprint('system', __name__)
+
+# Engine settings, applied with configure_engine():
+#   TRAFFIC_AI_SEED    seed for the AI engine RNG, for reproducible benchmark and replay runs
+#   TRAFFIC_TOPOLOGY   directory of a network compiled by compile_topology.py; unset keeps the demo network
+ENGINE_SETTINGS = ('TRAFFIC_AI_SEED', 'TRAFFIC_TOPOLOGY')
+engine_config = {setting: None for setting in ENGINE_SETTINGS}
+
+# AI Engine, loaded on first use (or by warm_up) so NumPy stays out of cold start
+traffic_ai = None
+_traffic_ai_lock = threading.Lock()
+
+# Compiled network topology, memory-mapped on first use
+network_topology = None
+_topology_lock = threading.Lock()
+
+# Shared-state role of this process and its state bus endpoint
+state_role = 'standalone'
+state_bus = None
+
+# Priority scheduling of API requests that touch the shared traffic state
+scheduler = PriorityScheduler()
 
 # In-memory storage (in production, use a real database)
 users_db = {}
-traffic_data = {
-    'intersections': {
-        'intersection_1': {
-            'id': 'intersection_1',
-            'name': 'Main St & 1st Ave',
-            'status': 'active',
-            'current_phase': 'north_south_green',
-            'traffic_count': 45,
-            'efficiency': 92,
-            'last_updated': datetime.datetime.now().isoformat()
-        },
-        'intersection_2': {
-            'id': 'intersection_2',
-            'name': 'Broadway & 2nd St',
-            'status': 'active',
-            'current_phase': 'east_west_green',
-            'traffic_count': 38,
-            'efficiency': 88,
-            'last_updated': datetime.datetime.now().isoformat()
+traffic_data = {}
+
+# Background batch optimization jobs, keyed by job id. Finished jobs are kept
+# for OPTIMIZATION_JOB_TTL seconds and at most MAX_OPTIMIZATION_JOBS are tracked.
+OPTIMIZATION_JOB_TTL = 3600
+MAX_OPTIMIZATION_JOBS = 1000
+optimization_jobs = {}
+_optimization_jobs_lock = threading.Lock()
+optimization_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='optimization-job')
+
+locations_db = []
+
+# Last full analytics payload, served in degraded mode when analytics are shed
+last_analytics = {}
+
+def load_seed_data():
+    """Populate the in-memory stores with the demo network"""
+    traffic_data.clear()
+    traffic_data.update({
+        'intersections': {
+            'intersection_1': {
+                'id': 'intersection_1',
+                'name': 'Main St & 1st Ave',
+                'region': 'downtown',
+                'status': 'active',
+                'current_phase': 'north_south_green',
+                'traffic_count': 45,
+                'efficiency': 92,
+                'last_updated': datetime.datetime.now().isoformat()
+            },
+            'intersection_2': {
+                'id': 'intersection_2',
+                'name': 'Broadway & 2nd St',
+                'region': 'downtown',
+                'status': 'active',
+                'current_phase': 'east_west_green',
+                'traffic_count': 38,
+                'efficiency': 88,
+                'last_updated': datetime.datetime.now().isoformat()
+            },
+            'intersection_3': {
+                'id': 'intersection_3',
+                'name': 'Park Ave & 3rd St',
+                'region': 'midtown',
+                'status': 'active',
+                'current_phase': 'north_south_green',
+                'traffic_count': 52,
+                'efficiency': 95,
+                'last_updated': datetime.datetime.now().isoformat()
+            },
+            'intersection_4': {
+                'id': 'intersection_4',
+                'name': 'Central Blvd & 4th Ave',
+                'region': 'midtown',
+                'status': 'active',
+                'current_phase': 'east_west_green',
+                'traffic_count': 41,
+                'efficiency': 89,
+                'last_updated': datetime.datetime.now().isoformat()
+            }
         },
-        'intersection_3': {
-            'id': 'intersection_3',
-            'name': 'Park Ave & 3rd St',
+        'system_stats': {
+            'total_intersections': 4,
+            'active_intersections': 4,
+            'average_efficiency': 91,
+            'total_vehicles_processed': 1247,
+            'congestion_level': 'low',
+            'last_optimization': datetime.datetime.now().isoformat()
+        }
+    })
+    
+    locations_db.clear()
+    locations_db.extend([
+        {
+            'id': '1',
+            'name': 'Downtown Central',
+            'address': 'Main St & 1st Ave',
+            'type': 'major_intersection',
             'status': 'active',
-            'current_phase': 'north_south_green',
-            'traffic_count': 52,
-            'efficiency': 95,
-            'last_updated': datetime.datetime.now().isoformat()
+            'coordinates': {'lat': 40.7128, 'lng': -74.0060},
+            'traffic_lights': 4,
+            'created_at': datetime.datetime.now().isoformat()
         },
-        'intersection_4': {
-            'id': 'intersection_4',
-            'name': 'Central Blvd & 4th Ave',
+        {
+            'id': '2',
+            'name': 'Business District',
+            'address': 'Broadway & 2nd St',
+            'type': 'commercial_zone',
             'status': 'active',
-            'current_phase': 'east_west_green',
-            'traffic_count': 41,
-            'efficiency': 89,
-            'last_updated': datetime.datetime.now().isoformat()
+            'coordinates': {'lat': 40.7589, 'lng': -73.9851},
+            'traffic_lights': 3,
+            'created_at': datetime.datetime.now().isoformat()
         }
-    },
-    'system_stats': {
-        'total_intersections': 4,
-        'active_intersections': 4,
-        'average_efficiency': 91,
-        'total_vehicles_processed': 1247,
-        'congestion_level': 'low',
-        'last_optimization': datetime.datetime.now().isoformat()
+    ])
+    
+    # A compiled network topology replaces the demo intersections; its state
+    # lives in arrays over the memory-mapped topology instead of per-node dicts
+    topology = get_topology()
+    if topology is not None:
+        from ai_engine.topology import IntersectionState
+        traffic_data['intersections'] = IntersectionState(topology)
+        traffic_data['system_stats'].update({
+            'total_intersections': len(topology),
+            'active_intersections': len(topology),
+            'average_efficiency': round(float(topology.efficiencies.mean()))
+        })
+
+# Helper Functions
+def load_engine_config(environ=None):
+    """Read the engine settings from the environment"""
+    environ = os.environ if environ is None else environ
+    return {
+        'TRAFFIC_AI_SEED': int(environ['TRAFFIC_AI_SEED']) if environ.get('TRAFFIC_AI_SEED') else None,
+        'TRAFFIC_TOPOLOGY': environ.get('TRAFFIC_TOPOLOGY') or None
     }
-}
-
-locations_db = [
-    {
-        'id': '1',
-        'name': 'Downtown Central',
-        'address': 'Main St & 1st Ave',
-        'type': 'major_intersection',
-        'status': 'active',
-        'coordinates': {'lat': 40.7128, 'lng': -74.0060},
-        'traffic_lights': 4,
-        'created_at': datetime.datetime.now().isoformat()
-    },
-    {
-        'id': '2',
-        'name': 'Business District',
-        'address': 'Broadway & 2nd St',
-        'type': 'commercial_zone',
-        'status': 'active',
-        'coordinates': {'lat': 40.7589, 'lng': -73.9851},
-        'traffic_lights': 3,
-        'created_at': datetime.datetime.now().isoformat()
+
+def configure_engine(config):
+    """
+    Apply engine settings; returns True if they changed
+    The AI engine and topology are rebuilt on next use after a change
+    """
+    global traffic_ai, network_topology
+    settings = {setting: config.get(setting) for setting in ENGINE_SETTINGS}
+    if settings == engine_config:
+        return False
+    
+    with _traffic_ai_lock, _topology_lock:
+        engine_config.update(settings)
+        traffic_ai = None
+        network_topology = None
+    return True
+
+def get_topology():
+    """Get the configured network topology, or None"""
+    global network_topology
+    if network_topology is None and engine_config['TRAFFIC_TOPOLOGY']:
+        with _topology_lock:
+            if network_topology is None:
+                from ai_engine.topology import NetworkTopology
+                network_topology = NetworkTopology(engine_config['TRAFFIC_TOPOLOGY'])
+    return network_topology
+
+def get_traffic_ai():
+    """Get the AI engine, importing and constructing it on first use"""
+    global traffic_ai
+    if traffic_ai is None:
+        with _traffic_ai_lock:
+            if traffic_ai is None:
+                from ai_engine.traffic_ai import TrafficAI
+                traffic_ai = TrafficAI(seed=engine_config['TRAFFIC_AI_SEED'], topology=get_topology())
+    return traffic_ai
+
+def scheduled(request_class, fallback=None):
+    """
+    Run a route through the priority scheduler under the given request class
+    If the request is shed, fallback() may supply a degraded response. The
+    response is serialized after the shared state is released, so views that
+    return plain data must return copies (see copy_traffic_data) rather than
+    the live stores.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                with scheduler.admit(request_class) as queue_wait:
+                    result = view(*args, **kwargs)
+            except SchedulerOverloaded as e:
+                response = fallback() if fallback else None
+                return response if response is not None else overloaded_response(e)
+            
+            response = make_response(result)
+            response.headers['X-Queue-Wait-Ms'] = f"{queue_wait * 1000:.2f}"
+            return response
+        return wrapper
+    return decorator
+
+# Entries per piece when a large store is streamed as JSON
+JSON_CHUNK_SIZE = 1000
+
+def iter_json(value):
+    """
+    Encode value as JSON piece by piece. Large stores are encoded a chunk of
+    entries at a time: a single encode of a city-scale network holds the
+    interpreter for about a second, stalling every other request thread,
+    emergencies included.
+    """
+    if hasattr(value, 'iter_chunks') or (isinstance(value, dict) and len(value) > JSON_CHUNK_SIZE):
+        chunks = value.iter_chunks(JSON_CHUNK_SIZE) if hasattr(value, 'iter_chunks') else (
+            dict(itertools.islice(value.items(), start, start + JSON_CHUNK_SIZE))
+            for start in range(0, len(value), JSON_CHUNK_SIZE)
+        )
+        yield '{'
+        separator = ''
+        for chunk in chunks:
+            if chunk:
+                yield separator + json.dumps(chunk, default=TrafficJSONProvider.default)[1:-1]
+                separator = ','
+        yield '}'
+    elif isinstance(value, dict) and any(isinstance(item, Mapping) for item in value.values()):
+        yield '{'
+        for position, (key, item) in enumerate(value.items()):
+            yield (',' if position else '') + json.dumps(str(key)) + ':'
+            yield from iter_json(item)
+        yield '}'
+    else:
+        yield json.dumps(value, default=TrafficJSONProvider.default)
+
+def json_stream_response(payload, status=200):
+    """Streamed JSON response for payloads that may contain city-scale stores"""
+    return Response(iter_json(payload), status=status, mimetype='application/json')
+
+def copy_traffic_data():
+    """
+    Copy of traffic_data to serialize once the shared state is released
+    A topology's IntersectionState is snapshotted column by column, which
+    takes about a millisecond even for city-scale networks
+    """
+    intersections = traffic_data['intersections']
+    if hasattr(intersections, 'snapshot'):
+        intersections = intersections.snapshot()
+    else:
+        intersections = {intersection_id: dict(intersection) for intersection_id, intersection in intersections.items()}
+    return {**traffic_data, 'intersections': intersections, 'system_stats': dict(traffic_data['system_stats'])}
+
+def overloaded_response(error):
+    """503 response for a request shed by the scheduler"""
+    response = make_response(jsonify({'error': str(error)}), 503)
+    response.headers['Retry-After'] = '1'
+    return response
+
+def degraded_analytics():
+    """Serve the last analytics payload when fresh analytics are shed"""
+    analytics = last_analytics
+    if not analytics:
+        return None
+    
+    return make_response(jsonify({
+        'status': 'success',
+        'degraded': True,
+        'data': analytics,
+        'timestamp': datetime.datetime.now().isoformat()
+    }), 200)
+
+class TrafficJSONProvider(DefaultJSONProvider):
+    """JSON provider that also serializes mapping stores such as a topology's IntersectionState"""
+    
+    @staticmethod
+    def default(o):
+        if isinstance(o, Mapping):
+            return o.to_dict() if hasattr(o, 'to_dict') else dict(o)
+        return DefaultJSONProvider.default(o)
+
+def owner_only(view):
+    """Refuse state-changing requests on read-only replicas"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if state_role == 'replica':
+            return jsonify({'error': 'Read-only replica; send this request to the state owner'}), 503
+        return view(*args, **kwargs)
+    return wrapper
+
+def get_state_topics():
+    """In-memory stores shared over the state bus, by topic name"""
+    return {
+        'intersections': traffic_data['intersections'],
+        'system_stats': traffic_data['system_stats'],
+        'users': users_db,
+        'locations': locations_db
     }
-]
 
-# Helper Functions
+def get_published_state():
+    """State bus topics as the owner publishes them; password hashes never leave the owner"""
+    topics = get_state_topics()
+    topics['users'] = {
+        user_id: {k: v for k, v in user.items() if k != 'password'}
+        for user_id, user in users_db.items()
+    }
+    return topics
+
+def expire_emergencies():
+    """Restore expired preemptions before the owner publishes its state"""
+    if traffic_ai is not None:
+        traffic_ai.emergency_manager.expire(traffic_data)
+
+def start_state_bus(role, address):
+    """
+    Start publishing (owner) or subscribing to (replica) the shared traffic state
+    A bus already running with other settings is stopped first
+    """
+    global state_role, state_bus
+    if state_bus is not None:
+        if state_role == role and state_bus.address == address:
+            return state_bus
+        state_bus.stop()
+        state_bus = None
+    
+    state_role = role
+    if role == 'owner':
+        state_bus = StatePublisher(address, get_published_state,
+                                   hold_state=lambda: scheduler.hold_state('status'),
+                                   before_publish=expire_emergencies)
+    elif role == 'replica':
+        traffic_data.setdefault('intersections', {})
+        traffic_data.setdefault('system_stats', {})
+        state_bus = StateSubscriber(address, get_state_topics,
+                                    hold_state=lambda: scheduler.hold_state('control'))
+    if state_bus is not None:
+        state_bus.start()
+    return state_bus
+
 def get_current_user():
     """Get current authenticated user"""
     user_id = session.get('user_id')
     return users_db.get(user_id) if user_id else None
 
-def generate_traffic_metrics():
-    """Generate realistic traffic metrics"""
+def select_intersections(intersection_ids=None, region=None):
+    """Resolve a list of intersection ids and/or a region to known intersection ids"""
+    intersections = traffic_data['intersections']
+    if region is not None and hasattr(intersections, 'region_ids'):
+        # Columnar network: look the region up in the topology
+        in_region = intersections.region_ids(region)
+        if intersection_ids is None:
+            return in_region
+        in_region = set(in_region)
+        return [i for i in intersection_ids if i in in_region]
+    
+    if intersection_ids is not None:
+        selected = [i for i in intersection_ids if i in intersections]
+    else:
+        selected = list(intersections.keys())
+    
+    if region is not None:
+        selected = [i for i in selected if intersections[i].get('region') == region]
+    
+    return selected
+
+def optimize_batch(intersection_ids):
+    """
+    Optimize the given intersections in one pass
+    Every optimized intersection gets new signal timing, but only those whose
+    efficiency or phase changed are returned
+    """
+    intersections = traffic_data['intersections']
+    traffic_ai = get_traffic_ai()
+    traffic_ai.emergency_manager.expire(traffic_data)  # expired preemptions are optimized again
+    originals = [intersections[i] for i in intersection_ids]
+    optimized = traffic_ai.optimize_intersections(originals)
+    
+    changed = {}
+    for original, result in zip(originals, optimized):
+        is_changed = any(original.get(key) != result.get(key) for key in ('efficiency', 'current_phase'))
+        original.update(result)
+        if is_changed:
+            changed[original['id']] = dict(original)
+    
+    traffic_data['system_stats']['last_optimization'] = datetime.datetime.now().isoformat()
+    
     return {
-        'timestamp': datetime.datetime.now().isoformat(),
-        'total_vehicles': random.randint(800, 1500),
-        'average_speed': round(random.uniform(25, 45), 1),
-        'congestion_level': random.choice(['low', 'moderate', 'high']),
-        'efficiency_score': random.randint(85, 98),
-        'incidents': random.randint(0, 3),
-        'emergency_vehicles': random.randint(0, 2)
+        'requested': len(intersection_ids),
+        'changed': len(changed),
+        'intersections': changed
     }
 
+def submit_optimization_job(intersection_ids):
+    """Queue a background batch optimization; returns the job id, or None when at capacity"""
+    now = datetime.datetime.now()
+    with _optimization_jobs_lock:
+        for job_id, job in list(optimization_jobs.items()):
+            finished_at = job.get('completed_at')
+            if finished_at and (now - datetime.datetime.fromisoformat(finished_at)).total_seconds() > OPTIMIZATION_JOB_TTL:
+                del optimization_jobs[job_id]
+        if len(optimization_jobs) >= MAX_OPTIMIZATION_JOBS:
+            return None
+        
+        job_id = str(uuid.uuid4())
+        optimization_jobs[job_id] = {
+            'id': job_id,
+            'status': 'pending',
+            'intersection_ids': intersection_ids,
+            'created_at': now.isoformat()
+        }
+    
+    optimization_executor.submit(run_optimization_job, job_id)
+    return job_id
+
+def run_optimization_job(job_id):
+    """Run a background batch optimization job through control admission"""
+    job = optimization_jobs[job_id]
+    job['status'] = 'running'
+    try:
+        with scheduler.admit('control'):
+            job['result'] = optimize_batch(job['intersection_ids'])
+        job['status'] = 'completed'
+    except Exception as e:
+        job['error'] = str(e)
+        job['status'] = 'failed'
+    job['completed_at'] = datetime.datetime.now().isoformat()
+
 # Authentication Routes
-@app.route('/api/auth/register', methods=['POST'])
+@api_bp.route('/api/auth/register', methods=['POST'])
+@owner_only
 def register():
     """User registration endpoint"""
     try:
@@ -159,7 +497,8 @@ def register():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/auth/login', methods=['POST'])
+@api_bp.route('/api/auth/login', methods=['POST'])
+@owner_only
 def login():
     """User login endpoint"""
     try:
@@ -197,13 +536,13 @@ def login():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/auth/logout', methods=['POST'])
+@api_bp.route('/api/auth/logout', methods=['POST'])
 def logout():
     """User logout endpoint"""
     session.clear()
     return jsonify({'message': 'Logout successful'}), 200
 
-@app.route('/api/auth/me', methods=['GET'])
+@api_bp.route('/api/auth/me', methods=['GET'])
 def get_current_user_info():
     """Get current user information"""
     user = get_current_user()
@@ -214,74 +553,189 @@ def get_current_user_info():
     return jsonify({'user': user_response}), 200
 
 # Traffic Management Routes
-@app.route('/api/traffic/status', methods=['GET'])
+@api_bp.route('/api/traffic/status', methods=['GET'])
+@scheduled('status')
 def get_traffic_status():
     """Get current traffic system status"""
     try:
-        # Update traffic data with AI optimization
-        optimized_data = traffic_ai.optimize_traffic_flow(traffic_data)
+        # Update traffic data with AI optimization; replicas serve the owner's latest state
+        if state_role != 'replica':
+            get_traffic_ai().optimize_traffic_flow(traffic_data)
         
-        return jsonify({
+        # Streamed by the server after scheduled() has released the state
+        return json_stream_response({
             'status': 'success',
-            'data': optimized_data,
+            'data': copy_traffic_data(),
             'timestamp': datetime.datetime.now().isoformat()
-        }), 200
+        })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/traffic/optimize', methods=['POST'])
+@api_bp.route('/api/traffic/optimize', methods=['POST'])
+@owner_only
+@scheduled('control')
 def optimize_traffic():
     """Trigger traffic optimization"""
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         intersection_id = data.get('intersection_id')
+        intersection_ids = data.get('intersection_ids')
+        region = data.get('region')
+        
+        if intersection_ids is not None or region is not None:
+            # Optimize a batch of intersections
+            if intersection_ids is not None and not (isinstance(intersection_ids, list) and
+                                                     all(isinstance(i, str) for i in intersection_ids)):
+                return jsonify({'error': 'intersection_ids must be a list of strings'}), 400
+            if region is not None and not isinstance(region, str):
+                return jsonify({'error': 'region must be a string'}), 400
+            
+            selected_ids = select_intersections(intersection_ids, region)
+            if not selected_ids:
+                return jsonify({'error': 'No matching intersections'}), 404
+            
+            if data.get('async') is True:
+                job_id = submit_optimization_job(selected_ids)
+                if job_id is None:
+                    return jsonify({'error': 'Too many optimization jobs; retry later'}), 503
+                
+                return jsonify({
+                    'status': 'accepted',
+                    'message': 'Traffic optimization scheduled',
+                    'job_id': job_id
+                }), 202
+            
+            return jsonify({
+                'status': 'success',
+                'message': 'Traffic optimization completed',
+                'data': optimize_batch(selected_ids)
+            }), 200
         
         if intersection_id and intersection_id in traffic_data['intersections']:
-            # Optimize specific intersection
-            result = traffic_ai.optimize_intersection(traffic_data['intersections'][intersection_id])
+            # Optimize specific intersection, restoring any expired preemption first
+            get_traffic_ai().emergency_manager.expire(traffic_data)
+            result = get_traffic_ai().optimize_intersection(traffic_data['intersections'][intersection_id])
             traffic_data['intersections'][intersection_id].update(result)
         else:
             # Optimize entire system
-            traffic_data.update(traffic_ai.optimize_traffic_flow(traffic_data))
+            traffic_data.update(get_traffic_ai().optimize_traffic_flow(traffic_data))
         
-        return jsonify({
+        return json_stream_response({
             'status': 'success',
             'message': 'Traffic optimization completed',
-            'data': traffic_data
-        }), 200
+            'data': copy_traffic_data()
+        })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/traffic/analytics', methods=['GET'])
+@api_bp.route('/api/traffic/optimize/<job_id>', methods=['GET'])
+def get_optimization_job(job_id):
+    """Poll a background batch optimization job"""
+    job = optimization_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Optimization job not found'}), 404
+    
+    return jsonify({
+        'status': 'success',
+        'data': job
+    }), 200
+
+@api_bp.route('/api/traffic/analytics', methods=['GET'])
+@scheduled('analytics', fallback=degraded_analytics)
 def get_traffic_analytics():
     """Get traffic analytics and metrics"""
+    global last_analytics
     try:
         # Generate analytics data
-        analytics = traffic_ai.generate_analytics(traffic_data)
+        analytics = get_traffic_ai().generate_analytics(traffic_data)
         
         # Add real-time metrics
-        analytics['real_time_metrics'] = generate_traffic_metrics()
+        analytics['real_time_metrics'] = get_traffic_ai().generate_realtime_metrics()
+        # Rebound, never mutated, so degraded_analytics() always sees a finished payload
+        last_analytics = analytics
         
-        return jsonify({
+        return {
             'status': 'success',
             'data': analytics,
             'timestamp': datetime.datetime.now().isoformat()
-        }), 200
+        }, 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/traffic/emergency', methods=['POST'])
+@api_bp.route('/api/traffic/history/export', methods=['GET'])
+def export_traffic_history():
+    """Stream historical intersection samples as a compressed columnar file"""
+    if not request.args.get('start') or not request.args.get('end'):
+        return jsonify({'error': 'start and end are required'}), 400
+    try:
+        interval = int(request.args.get('interval', 300))
+    except ValueError:
+        return jsonify({'error': 'interval must be a whole number of seconds'}), 400
+    
+    # The export holds an export slot until its stream is closed; it works
+    # on its own copy of the selection, so it never holds the shared state
+    admission = ExitStack()
+    try:
+        queue_wait = admission.enter_context(scheduler.admit('export', hold_state=False))
+    except SchedulerOverloaded as e:
+        return overloaded_response(e)
+    
+    try:
+        export_format = request.args.get('format', 'npz')
+        intersection_ids = request.args.get('intersections')
+        intersection_ids, traffic_counts = select_history_intersections(
+            traffic_data['intersections'],
+            intersection_ids.split(',') if intersection_ids else None
+        )
+        if not intersection_ids:
+            admission.close()
+            return jsonify({'error': 'No matching intersections'}), 404
+        
+        stream = stream_export(
+            get_traffic_ai(),
+            intersection_ids,
+            traffic_counts,
+            parse_time(request.args['start']),
+            parse_time(request.args['end']),
+            interval,
+            export_format
+        )
+    except ValueError as e:
+        admission.close()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        admission.close()
+        return jsonify({'error': str(e)}), 500
+    
+    filename = f"traffic_history.{EXPORT_FORMATS[export_format]['extension']}"
+    response = Response(
+        stream_with_context(stream),
+        mimetype=EXPORT_FORMATS[export_format]['mimetype'],
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+    response.headers['X-Queue-Wait-Ms'] = f"{queue_wait * 1000:.2f}"
+    response.call_on_close(admission.close)
+    return response
+
+@api_bp.route('/api/traffic/emergency', methods=['POST'])
+@owner_only
+@scheduled('emergency')
 def handle_emergency():
     """Handle emergency vehicle routing"""
     try:
         data = request.get_json()
         emergency_type = data.get('type', 'general')
         location = data.get('location')
+        duration = data.get('duration')
+        max_duration = current_app.config['EMERGENCY_MAX_DURATION']
+        if duration is not None and (isinstance(duration, bool) or not isinstance(duration, (int, float)) or
+                                     not 0 < duration <= max_duration):
+            return jsonify({'error': f'duration must be a number of seconds in (0, {max_duration:g}]'}), 400
         
-        result = traffic_ai.handle_emergency(traffic_data, emergency_type, location)
+        result = get_traffic_ai().handle_emergency(traffic_data, emergency_type, location, duration)
         
         return jsonify({
             'status': 'success',
@@ -292,8 +746,53 @@ def handle_emergency():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@api_bp.route('/api/traffic/emergency/active', methods=['GET'])
+@scheduled('status')
+def get_active_emergencies():
+    """Get active emergency preemptions"""
+    if state_role == 'replica':
+        # Replicas only see the preemption flags published by the owner
+        active = [{
+            'intersection_id': intersection['id'],
+            'emergency_id': intersection.get('emergency_id')
+        } for intersection in traffic_data['intersections'].values() if intersection.get('emergency_mode')]
+    else:
+        emergency_manager = get_traffic_ai().emergency_manager
+        emergency_manager.expire(traffic_data)
+        active = emergency_manager.get_active()
+    
+    return jsonify({
+        'status': 'success',
+        'data': active,
+        'timestamp': datetime.datetime.now().isoformat()
+    }), 200
+
+@api_bp.route('/api/traffic/emergency/<emergency_id>', methods=['DELETE'])
+@owner_only
+@scheduled('emergency')
+def clear_emergency(emergency_id):
+    """End an emergency early and restore its intersections"""
+    restored = get_traffic_ai().emergency_manager.clear(traffic_data, emergency_id)
+    if not restored:
+        return jsonify({'error': 'Active emergency not found'}), 404
+    
+    return jsonify({
+        'status': 'success',
+        'message': 'Emergency preemption cleared',
+        'data': {'restored_intersections': restored}
+    }), 200
+
+@api_bp.route('/api/scheduler/stats', methods=['GET'])
+def get_scheduler_stats():
+    """Get per-class request load and queue wait times"""
+    return jsonify({
+        'status': 'success',
+        'data': scheduler.get_stats(),
+        'timestamp': datetime.datetime.now().isoformat()
+    }), 200
+
 # Location Management Routes
-@app.route('/api/locations', methods=['GET'])
+@api_bp.route('/api/locations', methods=['GET'])
 def get_locations():
     """Get all locations"""
     return jsonify({
@@ -301,7 +800,8 @@ def get_locations():
         'data': locations_db
     }), 200
 
-@app.route('/api/locations', methods=['POST'])
+@api_bp.route('/api/locations', methods=['POST'])
+@owner_only
 def create_location():
     """Create a new location"""
     try:
@@ -340,7 +840,8 @@ def create_location():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/locations/<location_id>', methods=['PUT'])
+@api_bp.route('/api/locations/<location_id>', methods=['PUT'])
+@owner_only
 def update_location(location_id):
     """Update a location"""
     try:
@@ -372,7 +873,8 @@ def update_location(location_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/locations/<location_id>', methods=['DELETE'])
+@api_bp.route('/api/locations/<location_id>', methods=['DELETE'])
+@owner_only
 def delete_location(location_id):
     """Delete a location"""
     try:
@@ -381,8 +883,7 @@ def delete_location(location_id):
             return jsonify({'error': 'Authentication required'}), 401
         
         # Find and remove location
-        global locations_db
-        locations_db = [loc for loc in locations_db if loc['id'] != location_id]
+        locations_db[:] = [loc for loc in locations_db if loc['id'] != location_id]
         
         return jsonify({
             'status': 'success',
@@ -393,21 +894,27 @@ def delete_location(location_id):
         return jsonify({'error': str(e)}), 500
 
 # System Health Routes
-@app.route('/api/health', methods=['GET'])
+@system_bp.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
+    if current_app.config['APP_MODE'] == 'health':
+        ai_engine_status = 'disabled'
+    else:
+        ai_engine_status = 'running' if traffic_ai is not None else 'standby'
+    
     return jsonify({
         'status': 'healthy',
+        'message': 'Traffic Management System Backend is running',
         'timestamp': datetime.datetime.now().isoformat(),
         'version': '1.0.0',
         'services': {
             'api': 'running',
-            'ai_engine': 'running',
+            'ai_engine': ai_engine_status,
             'database': 'connected'
         }
     }), 200
 
-@app.route('/', methods=['GET'])
+@system_bp.route('/', methods=['GET'])
 def root():
     """Root endpoint"""
     return jsonify({
@@ -422,18 +929,83 @@ def root():
         }
     }), 200
 
+@system_bp.route('/api/test', methods=['GET'])
+def test():
+    """Connectivity check used by the frontend"""
+    return jsonify({'message': 'Backend connection successful!'})
+
 # Error Handlers
-@app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
 
-@app.errorhandler(500)
 def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
+def warm_up():
+    """Load the AI engine and its heavy dependencies ahead of the first request"""
+    get_traffic_ai()
+
+# Application Factory
+def create_app(mode='full', warm=False, config=None):
+    """
+    Create the Flask app
+    mode='health' serves only the system routes and never loads the AI engine
+    or seed data; warm=True loads the AI engine before returning. config
+    overrides settings otherwise read from the environment.
+    """
+    if mode not in APP_MODES:
+        raise ValueError(f"Unknown app mode: {mode}")
+    
+    app = Flask(__name__)
+    app.json = TrafficJSONProvider(app)
+    app.config['SECRET_KEY'] = 'smart-traffic-management-secret-key-2025'
+    app.config['SESSION_TYPE'] = 'filesystem'
+    app.config['APP_MODE'] = mode
+    app.config.update(load_engine_config())
+    # Multi-worker deployments: one 'owner' process, any number of 'replica' workers
+    app.config['TRAFFIC_STATE_ROLE'] = os.environ.get('TRAFFIC_STATE_ROLE', 'standalone')
+    app.config['TRAFFIC_STATE_BUS'] = os.environ.get('TRAFFIC_STATE_BUS', DEFAULT_BUS_ADDRESS)
+    # Longest emergency preemption a request may ask for, in seconds
+    app.config['EMERGENCY_MAX_DURATION'] = float(os.environ.get('EMERGENCY_MAX_DURATION', 1800))
+    app.config.update(config or {})
+    if app.config['TRAFFIC_STATE_ROLE'] not in STATE_ROLES:
+        raise ValueError(f"Unknown state role: {app.config['TRAFFIC_STATE_ROLE']}")
+    
+    # Enable CORS for React frontend
+    CORS(app, supports_credentials=True, origins=['http://localhost:3000', 'http://localhost:3001', 'http://localhost:3002', 'http://localhost:3003', 'http://localhost:3004', 'http://localhost:3005', 'http://localhost:3006', 'http://localhost:3007'])
+    
+    app.register_blueprint(system_bp)
+    if mode == 'full':
+        previous_topology = engine_config['TRAFFIC_TOPOLOGY']
+        configure_engine(app.config)
+        if not traffic_data or engine_config['TRAFFIC_TOPOLOGY'] != previous_topology:
+            load_seed_data()
+        app.register_blueprint(api_bp)
+        if warm:
+            warm_up()
+        app.extensions['traffic_state_bus'] = start_state_bus(app.config['TRAFFIC_STATE_ROLE'],
+                                                              app.config['TRAFFIC_STATE_BUS'])
+    
+    app.register_error_handler(404, not_found)
+    app.register_error_handler(500, internal_error)
+    
+    return app
+
+def __getattr__(name):
+    """Build the module-level `app` for `flask run` and `from app import app` on first access"""
+    if name == 'app':
+        global app
+        app = create_app(os.environ.get('TRAFFIC_APP_MODE', 'full'))
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 if __name__ == '__main__':
+    app = create_app(os.environ.get('TRAFFIC_APP_MODE', 'full'))
+    if app.config['APP_MODE'] == 'full':
+        warm_up()
+    
     print("🚦 Starting Smart Traffic Management System Backend...")
-    print("📊 AI Engine: Loaded")
+    print(f"📊 AI Engine: {'Loaded' if traffic_ai is not None else 'Disabled'}")
     print("🔐 Authentication: Enabled")
     print("🌐 CORS: Configured for React frontend")
     print("🚀 Server starting on http://localhost:5001")
@@ -442,5 +1014,7 @@ if __name__ == '__main__':
         host='0.0.0.0',
         port=5001,
         debug=True,
-        threaded=True
-    )
\ No newline at end of file
+        threaded=True,
+        # The reloader would start a second state owner or subscriber in its parent process
+        use_reloader=state_role == 'standalone'
+    )
@@ -0,0 +1,208 @@
+"""
+Bulk export of historical intersection data
+Streams per-intersection samples one day and one batch of intersections at a
+time as compressed columnar files, so neither a multi-month range nor a
+city-scale network ever has to fit in memory. Samples identify their
+intersection by an integer code into the export's table of intersection ids.
+
+Formats:
+  npz    NumPy archive with the id table as intersections/ids and one
+         compressed .npy member per column and chunk, e.g.
+         chunk_00000/traffic_count (always available)
+  arrow  Arrow IPC stream with one zstd-compressed record batch per chunk and
+         a dictionary-encoded intersection_id column (requires pyarrow)
+
+Usage: python history_export.py --start 2026-07-01 --end 2026-10-01
+           [--intersections intersection_1,intersection_2] [--interval 300]
+           [--format npz|arrow] -o history.npz
+"""
+
+import argparse
+import datetime
+import io
+import sys
+import zipfile
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+EXPORT_FORMATS = {
+    'npz': {'mimetype': 'application/octet-stream', 'extension': 'npz'},
+    'arrow': {'mimetype': 'application/vnd.apache.arrow.stream', 'extension': 'arrows'},
+}
+
+# Longest range a single export may cover
+MAX_EXPORT_DAYS = 366
+
+# Samples per chunk (about 7 MB); the intersections in a batch are sized from
+# the interval so a chunk stays this large whatever the sample rate
+HISTORY_CHUNK_ROWS = 288_000
+
+def parse_time(value: str) -> datetime.datetime:
+    """Parse an ISO date or datetime into a naive UTC datetime"""
+    parsed = datetime.datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def iter_history_chunks(traffic_ai, intersection_ids: Sequence[str], traffic_counts: Sequence[int],
+                        start: datetime.datetime, end: datetime.datetime, interval: int = 300,
+                        batch_size: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Yield column chunks per day in [start, end) and batch of intersections, trimmed to the range
+    batch_size defaults to as many intersections as fit in HISTORY_CHUNK_ROWS
+    """
+    import numpy as np
+
+    if end <= start:
+        raise ValueError('end must be after start')
+    if (end - start).days > MAX_EXPORT_DAYS:
+        raise ValueError(f'export range is limited to {MAX_EXPORT_DAYS} days')
+    if interval <= 0 or 86400 % interval:
+        raise ValueError('interval must evenly divide a day')
+    if batch_size is None:
+        batch_size = max(1, HISTORY_CHUNK_ROWS // (86400 // interval))
+
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day < end:
+        for first in range(0, len(intersection_ids), batch_size):
+            chunk = traffic_ai.generate_historical_samples(
+                intersection_ids[first:first + batch_size], traffic_counts[first:first + batch_size],
+                day, interval, first_code=first
+            )
+            if day < start or day + datetime.timedelta(days=1) > end:
+                keep = (chunk['timestamp'] >= np.datetime64(start, 's')) & (chunk['timestamp'] < np.datetime64(end, 's'))
+                chunk = {name: column[keep] for name, column in chunk.items()}
+            if len(chunk['timestamp']):
+                yield chunk
+        day += datetime.timedelta(days=1)
+
+class _StreamBuffer(io.RawIOBase):
+    """Write-only, unseekable sink whose contents are drained after each chunk"""
+
+    def __init__(self):
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+def stream_npz(chunks: Iterator[Dict], intersection_ids: Sequence[str]) -> Iterator[bytes]:
+    """Encode column chunks as a compressed .npz archive, yielding bytes as they are written"""
+    import numpy as np
+
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open('intersections/ids.npy', 'w', force_zip64=True) as member:
+            np.save(member, np.array(intersection_ids, dtype=str), allow_pickle=False)
+        for index, chunk in enumerate(chunks):
+            for name, column in chunk.items():
+                with archive.open(f'chunk_{index:05d}/{name}.npy', 'w', force_zip64=True) as member:
+                    np.save(member, column, allow_pickle=False)
+            yield buffer.drain()
+    yield buffer.drain()
+
+def stream_arrow(chunks: Iterator[Dict], intersection_ids: Sequence[str]) -> Iterator[bytes]:
+    """Encode column chunks as an Arrow IPC stream, one record batch per chunk"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ValueError("The 'arrow' export format requires pyarrow")
+
+    buffer = _StreamBuffer()
+    writer = None
+    ids = pa.array(intersection_ids, type=pa.string())
+    for chunk in chunks:
+        # The id table is written once, with the first batch, and referenced by code after that
+        columns = {name: column for name, column in chunk.items() if name != 'intersection_code'}
+        columns['intersection_id'] = pa.DictionaryArray.from_arrays(chunk['intersection_code'], ids)
+        batch = pa.RecordBatch.from_pydict(columns)
+        if writer is None:
+            writer = pa.ipc.new_stream(buffer, batch.schema, options=pa.ipc.IpcWriteOptions(compression='zstd'))
+        writer.write_batch(batch)
+        yield buffer.drain()
+    if writer is not None:
+        writer.close()
+    yield buffer.drain()
+
+def stream_export(traffic_ai, intersection_ids: Sequence[str], traffic_counts: Sequence[int],
+                  start: datetime.datetime, end: datetime.datetime, interval: int = 300,
+                  export_format: str = 'npz') -> Iterator[bytes]:
+    """Validate an export request and return its byte stream"""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}")
+
+    chunks = iter_history_chunks(traffic_ai, intersection_ids, traffic_counts, start, end, interval)
+    encoder = stream_npz if export_format == 'npz' else stream_arrow
+    stream = encoder(chunks, intersection_ids)
+    # Start the generator so bad parameters and missing dependencies fail
+    # before a response has been sent, not half-way through the stream
+    first = next(stream, b'')
+
+    def generate():
+        yield first
+        yield from stream
+    return generate()
+
+def select_history_intersections(intersections: Dict, intersection_ids: Optional[List[str]]) -> Tuple[List[str], List[int]]:
+    """
+    Resolve an optional list of intersection ids against the network
+    Returns the matching ids and their traffic counts
+    """
+    topology = getattr(intersections, 'topology', None)
+    if topology is not None:
+        # Columnar network: ids and counts come straight from the topology
+        if not intersection_ids:
+            return ([intersection_id.decode('utf-8') for intersection_id in topology.ids.tolist()],
+                    topology.traffic_counts.tolist())
+        intersection_ids = [i for i in intersection_ids if i in intersections]
+        return intersection_ids, topology.traffic_counts[topology.indices_of(intersection_ids)].tolist()
+
+    if not intersection_ids:
+        intersection_ids = list(intersections)
+    intersection_ids = [i for i in intersection_ids if i in intersections]
+    return intersection_ids, [intersections[i]['traffic_count'] for i in intersection_ids]
+
+def main():
+    parser = argparse.ArgumentParser(description='Export historical intersection data')
+    parser.add_argument('--start', required=True, help='start of the range (ISO date or datetime, UTC)')
+    parser.add_argument('--end', required=True, help='end of the range, exclusive')
+    parser.add_argument('--intersections', help='comma-separated intersection ids (default: all)')
+    parser.add_argument('--interval', type=int, default=300, help='sample interval in seconds')
+    parser.add_argument('--format', dest='export_format', choices=list(EXPORT_FORMATS), default='npz')
+    parser.add_argument('-o', '--output', required=True, help="output file, or '-' for stdout")
+    args = parser.parse_args()
+
+    import app
+
+    app.configure_engine(app.load_engine_config())
+    app.load_seed_data()
+    intersection_ids, traffic_counts = select_history_intersections(
+        app.traffic_data['intersections'],
+        args.intersections.split(',') if args.intersections else None
+    )
+    if not intersection_ids:
+        parser.error('no matching intersections')
+
+    try:
+        stream = stream_export(app.get_traffic_ai(), intersection_ids, traffic_counts, parse_time(args.start),
+                               parse_time(args.end), args.interval, args.export_format)
+    except ValueError as e:
+        parser.error(str(e))
+
+    output = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        for data in stream:
+            output.write(data)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+
+if __name__ == '__main__':
+    main()
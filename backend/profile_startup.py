@@ -0,0 +1,84 @@
+"""
+Startup profiler for the Smart Traffic Management backend
+Measures cold-start time of each app mode in a fresh interpreter and
+reports the slowest imports using Python's -X importtime output
+
+Usage: python profile_startup.py [--top N] [--warm]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+STARTUP_SNIPPET = '''
+import time
+start = time.perf_counter()
+import app
+app.create_app({mode!r}, warm={warm!r})
+print(round((time.perf_counter() - start) * 1000, 1))
+'''
+
+def profile_mode(mode, warm=False):
+    """Start the app in a fresh interpreter and collect its import timings"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_SNIPPET.format(mode=mode, warm=warm)],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, module = line.split('|')
+        imports.append({
+            'module': module.strip(),
+            'cumulative_ms': int(cumulative_us) / 1000
+        })
+
+    return {
+        'mode': mode,
+        'warm': warm,
+        'startup_ms': float(result.stdout.strip().splitlines()[-1]),
+        'modules_imported': len(imports),
+        'imports': imports
+    }
+
+def print_report(profile, top):
+    """Print the cold-start time and the slowest imports for one mode"""
+    label = f"{profile['mode']}{' + warm-up' if profile['warm'] else ''}"
+    print(f"🚦 Mode: {label}")
+    print(f"⏱️  Cold start: {profile['startup_ms']} ms ({profile['modules_imported']} modules imported)")
+
+    # Group by root package (flask, numpy, ...), otherwise every submodule is
+    # counted again and the app module itself tops the list with everything
+    packages = {}
+    for entry in profile['imports']:
+        root = entry['module'].split('.')[0]
+        if root != 'app':
+            packages[root] = max(packages.get(root, 0), entry['cumulative_ms'])
+    for root, cumulative_ms in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"   {cumulative_ms:>9.1f} ms  {root}")
+    print()
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile backend cold-start and import time')
+    parser.add_argument('--top', type=int, default=10, help='number of slowest imports to show')
+    parser.add_argument('--warm', action='store_true', help='also profile full mode with AI engine warm-up')
+    args = parser.parse_args()
+
+    runs = [('health', False), ('full', False)]
+    if args.warm:
+        runs.append(('full', True))
+
+    for mode, warm in runs:
+        print_report(profile_mode(mode, warm), args.top)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""
+Priority-aware request scheduling for the Smart Traffic Management API
+Gives every request class its own concurrency limit and admission control,
+and hands the shared traffic state to the highest-priority waiter first so
+emergency preemption never queues behind analytics or dashboard polling
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# Request classes; lower priority value is served first. max_queue and
+# max_wait bound admission (including the wait for the shared state) so
+# overloaded classes are shed instead of queued. Shared classes only read
+# the state and may hold it together. Exports stream for a long time from
+# their own copy of the selection, so they get their own slots.
+DEFAULT_REQUEST_CLASSES = {
+    'emergency': {'priority': 0, 'max_concurrent': 4, 'max_queue': None, 'max_wait': None, 'shared': False},
+    'control': {'priority': 1, 'max_concurrent': 4, 'max_queue': 16, 'max_wait': 2.0, 'shared': False},
+    'status': {'priority': 2, 'max_concurrent': 4, 'max_queue': 16, 'max_wait': 1.0, 'shared': False},
+    'analytics': {'priority': 3, 'max_concurrent': 2, 'max_queue': 4, 'max_wait': 0.5, 'shared': True},
+    'export': {'priority': 4, 'max_concurrent': 2, 'max_queue': 2, 'max_wait': 0.5, 'shared': True},
+}
+
+class SchedulerOverloaded(Exception):
+    """Raised when a request is refused by admission control"""
+
+    def __init__(self, request_class: str, reason: str):
+        super().__init__(f"{request_class} requests are overloaded: {reason}")
+        self.request_class = request_class
+        self.reason = reason
+
+class PriorityLock:
+    """
+    Shared/exclusive lock granted in priority order
+    Exclusive holders wait for every other holder; shared holders may enter
+    together unless an exclusive waiter is ahead of them
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._readers = 0
+        self._writer = False
+
+    def acquire(self, priority: int, shared: bool = False, timeout: Optional[float] = None) -> bool:
+        """Wait for the lock; returns False if timeout seconds pass first"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        with self._condition:
+            ticket = (priority, next(self._sequence), not shared)
+            self._waiters.append(ticket)
+            try:
+                while not self._can_enter(ticket):
+                    remaining = None if deadline is None else deadline - time.perf_counter()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+            finally:
+                self._waiters.remove(ticket)
+                self._condition.notify_all()
+            if shared:
+                self._readers += 1
+            else:
+                self._writer = True
+            return True
+
+    def release(self, shared: bool = False):
+        with self._condition:
+            if shared:
+                self._readers -= 1
+            else:
+                self._writer = False
+            self._condition.notify_all()
+
+    def _can_enter(self, ticket) -> bool:
+        if self._writer:
+            return False
+        ahead = [waiter for waiter in self._waiters if waiter < ticket]
+        if ticket[2]:
+            return self._readers == 0 and not ahead
+        return not any(exclusive for _, _, exclusive in ahead)
+
+class _ClassState:
+    """Counters and recent queue waits for one request class"""
+
+    def __init__(self, name: str, config: Dict, window: int):
+        self.name = name
+        self.priority = config['priority']
+        self.max_concurrent = config['max_concurrent']
+        self.max_queue = config['max_queue']
+        self.max_wait = config['max_wait']
+        self.shared = config.get('shared', False)
+        self.running = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_times = deque(maxlen=window)
+
+class PriorityScheduler:
+    """
+    Admission control and priority ordering for API requests
+    Each class has its own slots, so a flood of one class can never use up the
+    capacity reserved for another; access to shared state is priority-ordered
+    """
+
+    def __init__(self, request_classes: Dict[str, Dict] = None, window: int = 1000):
+        request_classes = request_classes or DEFAULT_REQUEST_CLASSES
+        self._condition = threading.Condition()
+        self._classes = {name: _ClassState(name, config, window) for name, config in request_classes.items()}
+        self.state_lock = PriorityLock()
+
+    @contextmanager
+    def admit(self, request_class: str, hold_state: bool = True):
+        """
+        Run a request of the given class: wait for one of its slots, then for
+        the shared state, both within the class's max_wait. Yields the queue
+        wait in seconds and raises SchedulerOverloaded if the request has to
+        be shed. hold_state=False only takes the slot, for long-running work
+        such as a streamed export that no longer touches the shared state.
+        """
+        state = self._classes[request_class]
+        started = time.perf_counter()
+
+        with self._condition:
+            if state.max_queue is not None and state.running >= state.max_concurrent and state.waiting >= state.max_queue:
+                state.rejected += 1
+                raise SchedulerOverloaded(request_class, 'queue full')
+
+            state.waiting += 1
+            deadline = None if state.max_wait is None else started + state.max_wait
+            try:
+                while state.running >= state.max_concurrent:
+                    timeout = None if deadline is None else deadline - time.perf_counter()
+                    if timeout is not None and timeout <= 0:
+                        state.rejected += 1
+                        raise SchedulerOverloaded(request_class, 'queue wait exceeded')
+                    self._condition.wait(timeout)
+            finally:
+                state.waiting -= 1
+            state.running += 1
+
+        try:
+            timeout = None if deadline is None else max(0, deadline - time.perf_counter())
+            if hold_state and not self.state_lock.acquire(state.priority, state.shared, timeout):
+                with self._condition:
+                    state.rejected += 1
+                raise SchedulerOverloaded(request_class, 'state wait exceeded')
+            queue_wait = time.perf_counter() - started
+            with self._condition:
+                state.admitted += 1
+                state.wait_times.append(queue_wait)
+            try:
+                yield queue_wait
+            finally:
+                if hold_state:
+                    self.state_lock.release(state.shared)
+        finally:
+            with self._condition:
+                state.running -= 1
+                self._condition.notify_all()
+
+    @contextmanager
+    def hold_state(self, request_class: str):
+        """Hold the shared state at a class priority, for work outside a request such as the state bus"""
+        state = self._classes[request_class]
+        self.state_lock.acquire(state.priority, state.shared)
+        try:
+            yield
+        finally:
+            self.state_lock.release(state.shared)
+
+    def get_stats(self) -> Dict:
+        """Per-class load and queue wait percentiles in milliseconds"""
+        with self._condition:
+            stats = {}
+            for name, state in self._classes.items():
+                waits = sorted(state.wait_times)
+                stats[name] = {
+                    'priority': state.priority,
+                    'max_concurrent': state.max_concurrent,
+                    'shared': state.shared,
+                    'running': state.running,
+                    'waiting': state.waiting,
+                    'admitted': state.admitted,
+                    'rejected': state.rejected,
+                    'queue_wait_ms': {
+                        'p50': _percentile_ms(waits, 0.50),
+                        'p99': _percentile_ms(waits, 0.99),
+                        'max': _percentile_ms(waits, 1.0)
+                    }
+                }
+            return stats
+
+def _percentile_ms(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return round(sorted_values[index] * 1000, 2)
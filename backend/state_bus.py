@@ -0,0 +1,268 @@
+"""
+Local state bus for multi-worker deployments
+One owner process holds the traffic state and publishes a snapshot to every
+new subscriber, followed by per-key deltas. Read-only API workers subscribe
+and apply them to their in-memory stores.
+
+Transport is newline-delimited JSON over a Unix domain socket, or over
+localhost TCP with a tcp://host:port address where Unix sockets are missing.
+The bus has no authentication, so TCP addresses must be on the loopback interface.
+"""
+
+import ipaddress
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import nullcontext
+from typing import Callable, Dict, Optional
+
+DEFAULT_BUS_ADDRESS = '/tmp/traffic_state.sock'
+
+def _parse_address(address: str):
+    """Socket family and socket address of a bus address"""
+    if address.startswith('tcp://'):
+        host, port = address[len('tcp://'):].rsplit(':', 1)
+        try:
+            loopback = host == 'localhost' or ipaddress.IPv4Address(host).is_loopback
+        except ValueError:
+            loopback = False
+        if not loopback:
+            raise ValueError(f"State bus TCP address must be on the loopback interface: {address}")
+        return socket.AF_INET, (host, int(port))
+    return socket.AF_UNIX, address
+
+def _open_socket(address: str):
+    """Create a socket and its address tuple for a bus address"""
+    family, socket_address = _parse_address(address)
+    return socket.socket(family, socket.SOCK_STREAM), socket_address
+
+def _encode(message: Dict) -> bytes:
+    return (json.dumps(message, default=str) + '\n').encode('utf-8')
+
+def _close(connection: socket.socket):
+    """Shut a socket down before closing it, so a thread blocked on it wakes up"""
+    try:
+        connection.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass  # never connected, or already gone
+    connection.close()
+
+def _copy_store(store):
+    """
+    Copy a plain store one level deep: its entries are replaced rather than
+    mutated in place, so this is enough to diff it later outside the state lock
+    """
+    if isinstance(store, dict):
+        return {key: dict(value) if isinstance(value, dict) else value for key, value in store.items()}
+    return [dict(item) if isinstance(item, dict) else item for item in store]
+
+class StatePublisher:
+    """
+    Owner side of the bus
+    topics() returns the live stores by name; dict stores are diffed per key,
+    list stores are replaced whole when they change. Versioned stores (with
+    copy_changes(), like IntersectionState) only send the
+    entries changed since the last publication, and their snapshot only the
+    entries changed since they were loaded. Only the copying happens while
+    the state is held; diffing and encoding happen after it is released.
+    Subscriber sockets get a send timeout, so one that stops reading is
+    dropped instead of stalling every publication.
+    """
+
+    def __init__(self, address: str, topics: Callable[[], Dict], hold_state: Callable = None,
+                 interval: float = 0.1, before_publish: Callable[[], None] = None,
+                 send_timeout: float = 2.0):
+        _parse_address(address)  # reject bad addresses before any thread starts
+        self.address = address
+        self.topics = topics
+        self.hold_state = hold_state or nullcontext
+        self.interval = interval
+        self.before_publish = before_publish
+        self.send_timeout = send_timeout
+        self.sequence = 0
+        self._published = {}
+        self._versions = {}
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._running = False
+
+    def start(self):
+        """Bind the bus and start accepting subscribers and publishing"""
+        self._server, bind_address = _open_socket(self.address)
+        if isinstance(bind_address, str) and os.path.exists(bind_address):
+            os.unlink(bind_address)  # stale socket from a previous owner
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(bind_address)
+        self._server.listen()
+        self._running = True
+
+        self.publish()
+        threading.Thread(target=self._accept_loop, name='state-bus-accept', daemon=True).start()
+        threading.Thread(target=self._publish_loop, name='state-bus-publish', daemon=True).start()
+
+    def stop(self):
+        self._running = False
+        if self._server is not None:
+            _close(self._server)
+        with self._lock:
+            for subscriber in self._subscribers:
+                _close(subscriber)
+            self._subscribers.clear()
+
+    def publish(self):
+        """Diff the stores against the last publication and send the changes"""
+        with self._lock:
+            with self.hold_state():
+                if self.before_publish:
+                    self.before_publish()
+                current, copied = {}, {}
+                for name, store in self.topics().items():
+                    if hasattr(store, 'copy_changes'):
+                        copied[name] = store.copy_changes(self._versions.get(name, 0))
+                    else:
+                        current[name] = _copy_store(store)
+
+            changes = {name: {'set': changed.to_dict(), 'remove': []} for name, changed in copied.items() if len(changed)}
+            for name, value in current.items():
+                previous = self._published.get(name)
+                if isinstance(value, dict) and isinstance(previous, dict):
+                    changed = {key: item for key, item in value.items() if previous.get(key) != item}
+                    removed = [key for key in previous if key not in value]
+                    if changed or removed:
+                        changes[name] = {'set': changed, 'remove': removed}
+                elif value != previous:
+                    changes[name] = {'replace': value}
+
+            if not changes:
+                return
+
+            self.sequence += 1
+            self._published = current
+            self._versions = {name: changed.version for name, changed in copied.items()}
+            self._broadcast(_encode({'type': 'delta', 'seq': self.sequence, 'topics': changes}))
+
+    def _broadcast(self, payload: bytes):
+        alive = []
+        for subscriber in self._subscribers:
+            try:
+                subscriber.sendall(payload)
+                alive.append(subscriber)
+            except OSError:  # gone, or fell behind past the send timeout
+                _close(subscriber)
+        self._subscribers = alive
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                subscriber, _ = self._server.accept()
+            except OSError:
+                break
+            subscriber.settimeout(self.send_timeout)
+            with self._lock:
+                try:
+                    subscriber.sendall(_encode({'type': 'snapshot', 'seq': self.sequence, 'topics': self._snapshot()}))
+                    self._subscribers.append(subscriber)
+                except OSError:
+                    _close(subscriber)
+
+    def _snapshot(self) -> Dict:
+        """The published state for a new subscriber; called with _lock held"""
+        with self.hold_state():
+            copied = {name: store.copy_changes(0) for name, store in self.topics().items()
+                      if hasattr(store, 'copy_changes')}
+        topics = dict(self._published)
+        topics.update((name, changed.to_dict()) for name, changed in copied.items())
+        return topics
+
+    def _publish_loop(self):
+        while self._running:
+            time.sleep(self.interval)
+            try:
+                self.publish()
+            except Exception as e:
+                print(f"Error publishing traffic state: {str(e)}")
+
+class StateSubscriber:
+    """
+    Worker side of the bus
+    Applies the owner's snapshot and deltas to the stores returned by
+    topics(), reconnecting whenever the owner goes away or a message cannot
+    be applied; the fresh snapshot replaces anything half-applied
+    """
+
+    def __init__(self, address: str, topics: Callable[[], Dict], hold_state: Callable = None,
+                 retry_interval: float = 1.0):
+        _parse_address(address)  # reject bad addresses before any thread starts
+        self.address = address
+        self.topics = topics
+        self.hold_state = hold_state or nullcontext
+        self.retry_interval = retry_interval
+        self.sequence: Optional[int] = None
+        self.connected = False
+        self._running = False
+        self._connection = None
+
+    def start(self):
+        self._running = True
+        threading.Thread(target=self._run, name='state-bus-subscribe', daemon=True).start()
+
+    def stop(self):
+        self._running = False
+        connection = self._connection
+        if connection is not None:
+            _close(connection)
+
+    def apply(self, message: Dict):
+        """Apply one snapshot or delta message to the local stores"""
+        with self.hold_state():
+            stores = self.topics()
+            for name, change in message['topics'].items():
+                store = stores.get(name)
+                if store is None:
+                    continue
+                if message['type'] == 'snapshot':
+                    _replace(store, change)
+                elif 'replace' in change:
+                    _replace(store, change['replace'])
+                else:
+                    store.update(change['set'])
+                    for key in change['remove']:
+                        store.pop(key, None)
+            self.sequence = message['seq']
+
+    def _run(self):
+        while self._running:
+            connection, connect_address = _open_socket(self.address)
+            self._connection = connection
+            try:
+                connection.connect(connect_address)
+                self.connected = True
+                with connection.makefile('r', encoding='utf-8') as stream:
+                    for line in stream:
+                        message = json.loads(line)
+                        if message['type'] == 'delta' and self.sequence is not None and message['seq'] != self.sequence + 1:
+                            break  # missed a delta; reconnect for a fresh snapshot
+                        self.apply(message)
+            except OSError:
+                pass
+            except Exception as e:
+                print(f"Error applying traffic state update: {str(e)}")
+            finally:
+                self.connected = False
+                self._connection = None
+                _close(connection)
+            if self._running:
+                time.sleep(self.retry_interval)
+
+def _replace(store, value):
+    if hasattr(store, 'reset'):
+        store.reset()
+        store.update(value)
+    elif isinstance(store, dict):
+        store.clear()
+        store.update(value)
+    else:
+        store[:] = value
@@ -0,0 +1,91 @@
+"""Tests for the priority lock and admission control in request_scheduler"""
+
+import threading
+import time
+
+import pytest
+
+from request_scheduler import PriorityLock, PriorityScheduler, SchedulerOverloaded
+
+def wait_for_waiters(lock, count, timeout=2.0):
+    """Block until count threads are queued on the lock"""
+    deadline = time.monotonic() + timeout
+    while len(lock._waiters) < count:
+        assert time.monotonic() < deadline, 'waiters never queued'
+        time.sleep(0.001)
+
+def start_waiter(lock, priority, order, shared=False):
+    def run():
+        lock.acquire(priority, shared)
+        order.append(priority)
+        lock.release(shared)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+def test_exclusive_waiters_are_served_by_priority():
+    lock = PriorityLock()
+    lock.acquire(0)
+    order = []
+    threads = []
+    for count, priority in enumerate((3, 1, 2), start=1):
+        threads.append(start_waiter(lock, priority, order))
+        wait_for_waiters(lock, count)
+
+    lock.release()
+    for thread in threads:
+        thread.join()
+    assert order == [1, 2, 3]
+
+def test_shared_holders_enter_together():
+    lock = PriorityLock()
+    assert lock.acquire(3, shared=True)
+    assert lock.acquire(3, shared=True, timeout=0.1)
+    lock.release(shared=True)
+    lock.release(shared=True)
+
+def test_exclusive_waiter_blocks_later_readers_but_not_better_ones():
+    lock = PriorityLock()
+    lock.acquire(3, shared=True)
+    order = []
+    writer = start_waiter(lock, 1, order)
+    wait_for_waiters(lock, 1)
+
+    assert not lock.acquire(2, shared=True, timeout=0.05)  # queued behind the writer
+    assert lock.acquire(0, shared=True, timeout=0.05)      # ahead of the writer
+    lock.release(shared=True)
+
+    lock.release(shared=True)
+    writer.join()
+    assert order == [1]
+
+def test_timeout_gives_up_and_leaves_the_lock_usable():
+    lock = PriorityLock()
+    lock.acquire(0)
+    started = time.perf_counter()
+    assert not lock.acquire(1, timeout=0.05)
+    assert time.perf_counter() - started >= 0.05
+    assert lock._waiters == []
+
+    lock.release()
+    assert lock.acquire(1, timeout=0.05)
+    lock.release()
+
+def test_admit_sheds_at_the_state_wait_and_counts_it_only_as_rejected():
+    scheduler = PriorityScheduler()
+    with scheduler.hold_state('emergency'):
+        with pytest.raises(SchedulerOverloaded, match='state wait exceeded'):
+            with scheduler.admit('analytics'):
+                pass
+
+    stats = scheduler.get_stats()['analytics']
+    assert stats['admitted'] == 0
+    assert stats['rejected'] == 1
+    assert stats['running'] == 0
+
+def test_admit_without_state_only_takes_a_slot():
+    scheduler = PriorityScheduler()
+    with scheduler.hold_state('emergency'):
+        with scheduler.admit('analytics', hold_state=False):
+            assert scheduler.get_stats()['analytics']['running'] == 1
+    assert scheduler.get_stats()['analytics']['admitted'] == 1
@@ -0,0 +1,104 @@
+"""Tests for applying state bus messages and recovering from bad ones"""
+
+import socket
+import time
+
+from state_bus import StatePublisher, StateSubscriber, _replace
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'condition never became true'
+        time.sleep(0.005)
+
+class ResettableStore(dict):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.resets = 0
+
+    def reset(self):
+        self.resets += 1
+        self.clear()
+
+class FailingOnceStore(dict):
+    def __init__(self):
+        super().__init__()
+        self.failed = False
+
+    def update(self, *args, **kwargs):
+        if not self.failed:
+            self.failed = True
+            raise ValueError('corrupt entry')
+        super().update(*args, **kwargs)
+
+def make_subscriber(stores):
+    return StateSubscriber('/tmp/unused.sock', lambda: stores)
+
+def test_replace_handles_dicts_lists_and_resettable_stores():
+    mapping = {'old': 1}
+    _replace(mapping, {'new': 2})
+    assert mapping == {'new': 2}
+
+    items = [1, 2, 3]
+    _replace(items, [4])
+    assert items == [4]
+
+    store = ResettableStore({'old': 1})
+    _replace(store, {'new': 2})
+    assert store == {'new': 2}
+    assert store.resets == 1
+
+def test_apply_snapshot_then_deltas():
+    intersections, alerts = {'stale': {}}, ['stale']
+    subscriber = make_subscriber({'intersections': intersections, 'alerts': alerts})
+
+    subscriber.apply({'type': 'snapshot', 'seq': 4, 'topics': {
+        'intersections': {'A': {'efficiency': 80}, 'B': {'efficiency': 70}},
+        'alerts': ['a1'],
+        'unknown': {'ignored': True}
+    }})
+    assert intersections == {'A': {'efficiency': 80}, 'B': {'efficiency': 70}}
+    assert alerts == ['a1']
+    assert subscriber.sequence == 4
+
+    subscriber.apply({'type': 'delta', 'seq': 5, 'topics': {
+        'intersections': {'set': {'A': {'efficiency': 90}}, 'remove': ['B', 'missing']},
+        'alerts': {'replace': ['a2']}
+    }})
+    assert intersections == {'A': {'efficiency': 90}}
+    assert alerts == ['a2']
+    assert subscriber.sequence == 5
+
+def test_subscriber_reconnects_after_a_message_fails_to_apply(tmp_path):
+    published = {'A': {'efficiency': 80}}
+    publisher = StatePublisher(str(tmp_path / 'bus.sock'), lambda: {'intersections': published})
+    publisher.start()
+    store = FailingOnceStore()
+    subscriber = StateSubscriber(publisher.address, lambda: {'intersections': store}, retry_interval=0.01)
+    subscriber.start()
+    try:
+        wait_until(lambda: store == published)
+        assert store.failed
+        assert subscriber.sequence == publisher.sequence
+    finally:
+        subscriber.stop()
+        publisher.stop()
+
+def test_publisher_drops_a_subscriber_that_stops_reading(tmp_path):
+    published = {'blob': ''}
+    publisher = StatePublisher(str(tmp_path / 'bus.sock'), lambda: {'data': published},
+                               interval=3600, send_timeout=0.05)
+    publisher.start()
+    stalled = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stalled.connect(publisher.address)
+    try:
+        wait_until(lambda: len(publisher._subscribers) == 1)
+        for size in range(1, 20):
+            published['blob'] = 'x' * (size << 20)
+            publisher.publish()
+            if not publisher._subscribers:
+                break
+        assert publisher._subscribers == []
+    finally:
+        stalled.close()
+        publisher.stop()